@@ -1,33 +1,93 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, request, jsonify, send_from_directory, send_file, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from datetime import datetime, timedelta
 import os
-from gcode_parser import GCodeParser
+from gcode_parser import parse_gcode_file
+from sqlalchemy import event, insert, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import selectinload
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.types import JSON
 import threading
 import time
+from itertools import chain
 import requests
+from requests.adapters import HTTPAdapter
 import io
-import pandas as pd
+import xlsxwriter
+import orjson
 import argparse
 from dotenv import load_dotenv
 
+try:
+    import websocket  # websocket-client
+except ImportError:
+    websocket = None
+
 # Load environment variables from .env file
 load_dotenv()
 
+class ORJSONProvider(JSONProvider):
+    """Serve JSON with orjson, which also encodes datetimes as ISO 8601 natively."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__, static_folder='static')
+app.json = ORJSONProvider(app)
 CORS(app)
 
 # Configure SQLite database
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///printer_logbook.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Keep SQLite connections alive between requests so each one's page cache stays
+# warm. A QueuePool rather than a StaticPool, so the polling thread and request
+# handlers never share a single connection mid-transaction.
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'poolclass': QueuePool,
+    'pool_size': 5,
+    'max_overflow': 5,
+    'pool_pre_ping': False,
+    'connect_args': {'check_same_thread': False, 'timeout': 30},
+}
 app.config['UPLOAD_FOLDER'] = 'uploads'
 db = SQLAlchemy(app)
 
+# WAL lets request handlers keep reading while the polling thread writes, and
+# synchronous=NORMAL is safe under WAL while skipping an fsync per commit.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-64000',
+    'PRAGMA foreign_keys=ON',
+)
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+with app.app_context():
+    event.listen(db.engine, 'connect', set_sqlite_pragmas)
+
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Prints with the same filename starting in the same window are duplicates
+DUPLICATE_WINDOW_SECONDS = 180
+
+def duplicate_bucket(start_time):
+    """Map a naive UTC start time onto its duplicate-detection window."""
+    return int((start_time - datetime(1970, 1, 1)).total_seconds()) // DUPLICATE_WINDOW_SECONDS
+
 # Database Models
 class PrintJob(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -44,10 +104,13 @@ class PrintJob(db.Model):
     notes = db.Column(db.Text)
     parameters = db.relationship('PrintParameters', backref='print_job', lazy=True)
     all_slicer_params = db.Column(JSON)
+    start_bucket = db.Column(db.Integer)  # duplicate_bucket(start_time)
 
     # Add composite index for efficient duplicate checking
     __table_args__ = (
         db.Index('idx_filename_start_time', 'filename', 'start_time'),
+        # Lets SQLite reject duplicate prints atomically on insert
+        db.Index('idx_filename_bucket', 'filename', 'start_bucket', unique=True),
     )
 
 class PrintParameters(db.Model):
@@ -63,6 +126,44 @@ class MaintenanceEvent(db.Model):
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     todo_tasks = db.Column(db.Text)
 
+def insert_print_parameters(print_job_id, parameters):
+    """Store parsed GCode parameters for a print in a single executemany."""
+    rows = [{
+        'print_job_id': print_job_id,
+        'parameter_name': name,
+        'parameter_value': str(value)
+    } for name, value in parameters.items() if value is not None and name != 'all_slicer_params']
+    if rows:
+        db.session.execute(insert(PrintParameters), rows)
+
+def recent_print_exists(filename, cutoff):
+    """Check for a print of this file started since cutoff.
+
+    Only the id is selected: SQLite index entries carry the rowid, so
+    idx_filename_start_time answers this without touching the table.
+    """
+    return db.session.query(PrintJob.id).filter(
+        PrintJob.filename == filename,
+        PrintJob.start_time >= cutoff
+    ).limit(1).scalar() is not None
+
+def upgrade_schema():
+    """Add columns and indexes introduced after a database was first created."""
+    columns = {row[1] for row in db.session.execute(text('PRAGMA table_info(print_job)'))}
+    if 'start_bucket' not in columns:
+        # Existing rows keep a NULL bucket, which never conflicts in the unique index
+        db.session.execute(text('ALTER TABLE print_job ADD COLUMN start_bucket INTEGER'))
+        db.session.commit()
+    for index in PrintJob.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
+# Create and migrate the schema on import so WSGI servers, which never run
+# __main__, get it too, and before the print watcher thread starts querying
+with app.app_context():
+    # db.drop_all() # if for whatever reason you want to drop all
+    db.create_all()
+    upgrade_schema()
+
 # Parse command line arguments
 parser = argparse.ArgumentParser(description='Printer Logbook Application')
 parser.add_argument('--moonraker-url', type=str,
@@ -75,128 +176,177 @@ args, unknown = parser.parse_known_args()
 MOONRAKER_URL = args.moonraker_url or os.getenv('MOONRAKER_URL', 'http://192.168.1.10:7125')
 POLL_INTERVAL = args.poll_interval or int(os.getenv('POLL_INTERVAL', '15'))
 
+# Seconds without any websocket message before reconnecting to Moonraker
+MOONRAKER_WS_TIMEOUT = 60
+
+# Reuse keep-alive connections to Moonraker instead of reconnecting on every call
+MOONRAKER_SESSION = requests.Session()
+MOONRAKER_SESSION.mount('http://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+MOONRAKER_SESSION.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+def moonraker_rpc_batch(calls, timeout=5):
+    """Send (method, params) pairs to Moonraker as one JSON-RPC batch request.
+
+    Returns each call's result in order, or None for a call that errored.
+    """
+    batch = [{'jsonrpc': '2.0', 'method': method, 'params': params, 'id': call_id}
+             for call_id, (method, params) in enumerate(calls)]
+    resp = MOONRAKER_SESSION.post(f'{MOONRAKER_URL}/server/jsonrpc', json=batch, timeout=timeout)
+    resp.raise_for_status()
+    results = {r.get('id'): r.get('result') for r in resp.json()}
+    return [results.get(call_id) for call_id in range(len(calls))]
+
+def record_print_start(filename):
+    """Record an auto-detected print, downloading and parsing its GCode."""
+    # Buckets are fixed windows, so a detection just after a bucket boundary
+    # would miss one just before it; look back a full window for that case
+    start_time = datetime.utcnow()
+    if recent_print_exists(filename, start_time - timedelta(seconds=DUPLICATE_WINDOW_SECONDS)):
+        print(f"Skipping duplicate print detection for {filename} - already exists")
+        return
+
+    # Claim the print in one statement; the unique (filename, start_bucket)
+    # index makes SQLite skip a duplicate that raced in within this window
+    result = db.session.execute(
+        sqlite_insert(PrintJob).values(
+            filename=filename,
+            gcode_path='',
+            start_time=start_time,
+            start_bucket=duplicate_bucket(start_time),
+            status=None
+        ).on_conflict_do_nothing(index_elements=['filename', 'start_bucket'])
+    )
+    db.session.commit()
+
+    if not result.rowcount:
+        print(f"Skipping duplicate print detection for {filename} - already exists")
+        return
+
+    print_job_id = result.inserted_primary_key[0]
+    # Try to download the GCode file from Moonraker
+    gcode_url = f'{MOONRAKER_URL}/server/files/gcodes/{filename}'
+    local_path = os.path.join(app.config['UPLOAD_FOLDER'], f"auto_{start_time.strftime('%Y%m%d_%H%M%S')}_{filename}")
+    # Download under a temporary name so a dropped connection never leaves a
+    # truncated file at local_path
+    partial_path = local_path + '.part'
+    try:
+        # Stream to disk in chunks rather than holding the whole file in memory
+        with MOONRAKER_SESSION.get(gcode_url, stream=True, timeout=(5, 60)) as file_resp:
+            if file_resp.status_code == 200:
+                with open(partial_path, 'wb') as f:
+                    for chunk in file_resp.iter_content(1 << 20):
+                        f.write(chunk)
+                os.replace(partial_path, local_path)
+                # Parse GCode parameters
+                parameters = parse_gcode_file(local_path)
+
+                db.session.execute(
+                    update(PrintJob)
+                    .where(PrintJob.id == print_job_id)
+                    .values(
+                        gcode_path=local_path,
+                        all_slicer_params=parameters.get('all_slicer_params', {})
+                    )
+                )
+                insert_print_parameters(print_job_id, parameters)
+                db.session.commit()
+                print(f"Added new auto-detected print: {filename}")
+            else:
+                # If file not found, keep the basic info already inserted
+                print(f"Added basic print info for: {filename}")
+    except Exception as e:
+        db.session.rollback()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        print(f"Moonraker GCode download/parse error: {e}")
+        print(f"Added minimal print info for: {filename}")
+
+def track_print_state(print_stats, last_state, last_filename):
+    """Record a print when print_stats shows one starting.
+
+    Returns the (state, filename) pair to compare the next update against.
+    """
+    state = print_stats.get('state')
+    filename = print_stats.get('filename')
+    if state == 'printing' and filename:
+        # Only process if we transition to printing AND filename changed
+        if last_state != 'printing' or last_filename != filename:
+            # db.session is scoped to the app context, so the watcher gets its
+            # own session and pooled connection separate from request handlers
+            with app.app_context():
+                record_print_start(filename)
+        return 'printing', filename
+    if state != 'printing':
+        last_filename = None
+    return state, last_filename
+
 def poll_moonraker_for_prints():
+    """Fallback watcher that polls Moonraker every POLL_INTERVAL seconds."""
     last_state = None
     last_filename = None
-    processing_files = set()  # Track files currently being processed
     while True:
         try:
-            with app.app_context():
-                resp = requests.get(f'{MOONRAKER_URL}/printer/objects/query?print_stats', timeout=5)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    print_stats = data.get('result', {}).get('status', {}).get('print_stats', {})
-                    state = print_stats.get('state')
-                    filename = print_stats.get('filename')
-                    if state == 'printing' and filename:
-                        # Only process if we transition to printing AND filename changed
-                        if (last_state != 'printing' or last_filename != filename) and filename not in processing_files:
-                            processing_files.add(filename)
-                            try:
-                                # Check if we already have a recent print with this filename (within last 3 minutes)
-                                recent_cutoff = datetime.utcnow() - timedelta(minutes=3)
-                                existing_print = PrintJob.query.filter(
-                                    PrintJob.filename == filename,
-                                    PrintJob.start_time >= recent_cutoff
-                                ).first()
-
-                                if existing_print:
-                                    print(f"Skipping duplicate print detection for {filename} - already exists")
-                                else:
-                                    # Try to download the GCode file from Moonraker
-                                    gcode_url = f'{MOONRAKER_URL}/server/files/gcodes/{filename}'
-                                    local_path = os.path.join(app.config['UPLOAD_FOLDER'], f"auto_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{filename}")
-                                    try:
-                                        file_resp = requests.get(gcode_url, timeout=10)
-                                        if file_resp.status_code == 200:
-                                            with open(local_path, 'wb') as f:
-                                                f.write(file_resp.content)
-                                            # Parse GCode parameters
-                                            parser = GCodeParser()
-                                            parameters = parser.parse_file(local_path)
-
-                                            # Double-check for duplicates right before insertion
-                                            final_check = PrintJob.query.filter(
-                                                PrintJob.filename == filename,
-                                                PrintJob.start_time >= recent_cutoff
-                                            ).first()
-
-                                            if not final_check:
-                                                new_print = PrintJob(
-                                                    filename=filename,
-                                                    gcode_path=local_path,
-                                                    start_time=datetime.utcnow(),
-                                                    status=None,
-                                                    all_slicer_params=parameters.get('all_slicer_params', {})
-                                                )
-                                                db.session.add(new_print)
-                                                db.session.flush()
-                                                # Add parameters
-                                                for name, value in parameters.items():
-                                                    if value is not None and name != 'all_slicer_params':
-                                                        param = PrintParameters(
-                                                            print_job_id=new_print.id,
-                                                            parameter_name=name,
-                                                            parameter_value=str(value)
-                                                        )
-                                                        db.session.add(param)
-                                                db.session.commit()
-                                                print(f"Added new auto-detected print: {filename}")
-                                            else:
-                                                print(f"Final duplicate check prevented creation of {filename}")
-                                        else:
-                                            # If file not found, just add basic info
-                                            final_check = PrintJob.query.filter(
-                                                PrintJob.filename == filename,
-                                                PrintJob.start_time >= recent_cutoff
-                                            ).first()
-
-                                            if not final_check:
-                                                new_print = PrintJob(
-                                                    filename=filename,
-                                                    gcode_path='',
-                                                    start_time=datetime.utcnow(),
-                                                    status=None
-                                                )
-                                                db.session.add(new_print)
-                                                db.session.commit()
-                                                print(f"Added basic print info for: {filename}")
-                                            else:
-                                                print(f"Prevented duplicate basic print for {filename}")
-                                    except Exception as e:
-                                        print(f"Moonraker GCode download/parse error: {e}")
-                                        # Add print with minimal info - final duplicate check
-                                        final_check = PrintJob.query.filter(
-                                            PrintJob.filename == filename,
-                                            PrintJob.start_time >= recent_cutoff
-                                        ).first()
-
-                                        if not final_check:
-                                            new_print = PrintJob(
-                                                filename=filename,
-                                                gcode_path='',
-                                                start_time=datetime.utcnow(),
-                                                status=None
-                                            )
-                                            db.session.add(new_print)
-                                            db.session.commit()
-                                            print(f"Added minimal print info for: {filename}")
-                                        else:
-                                            print(f"Prevented duplicate minimal print for {filename}")
-                            finally:
-                                processing_files.discard(filename)
-                        last_state = 'printing'
-                        last_filename = filename
-                    else:
-                        last_state = state
-                        if state != 'printing':
-                            last_filename = None
+            # Everything the poller needs comes back in a single round trip;
+            # add calls here rather than issuing more requests per poll
+            [status] = moonraker_rpc_batch([
+                ('printer.objects.query', {'objects': {'print_stats': None}}),
+            ])
+            if status:
+                print_stats = status.get('status', {}).get('print_stats', {})
+                last_state, last_filename = track_print_state(print_stats, last_state, last_filename)
         except Exception as e:
             print(f"Moonraker polling error: {e}")
         time.sleep(POLL_INTERVAL)
 
-# Start polling in a background thread when the app starts
-polling_thread = threading.Thread(target=poll_moonraker_for_prints, daemon=True)
+def watch_moonraker_for_prints():
+    """Follow print_stats over Moonraker's websocket, reacting only to pushed changes."""
+    ws_url = 'ws' + MOONRAKER_URL[len('http'):] + '/websocket'
+    subscribe = orjson.dumps({
+        'jsonrpc': '2.0',
+        'method': 'printer.objects.subscribe',
+        'params': {'objects': {'print_stats': ['state', 'filename']}},
+        'id': 1
+    }).decode()
+    last_state = None
+    last_filename = None
+    while True:
+        ws = None
+        try:
+            # Moonraker pushes proc stats every second, so a silent socket is dead
+            ws = websocket.create_connection(ws_url, timeout=MOONRAKER_WS_TIMEOUT)
+            ws.send(subscribe)
+            print_stats = {}
+            while True:
+                raw = ws.recv()
+                if not raw:
+                    raise ConnectionError('connection closed by Moonraker')
+                message = orjson.loads(raw)
+                method = message.get('method')
+                if message.get('id') == 1:
+                    # Subscribing returns the full current state
+                    print_stats = message.get('result', {}).get('status', {}).get('print_stats', {})
+                elif method == 'notify_status_update':
+                    # Updates carry only the fields that changed
+                    print_stats.update(message['params'][0].get('print_stats', {}))
+                elif method == 'notify_klippy_ready':
+                    ws.send(subscribe)
+                    continue
+                else:
+                    continue
+                last_state, last_filename = track_print_state(print_stats, last_state, last_filename)
+        except Exception as e:
+            print(f"Moonraker websocket error: {e}")
+        finally:
+            if ws is not None:
+                ws.close()
+        time.sleep(POLL_INTERVAL)
+
+# Watch for prints in a background thread when the app starts, falling back to
+# polling when websocket-client isn't installed
+polling_thread = threading.Thread(
+    target=watch_moonraker_for_prints if websocket else poll_moonraker_for_prints,
+    daemon=True
+)
 polling_thread.start()
 
 # Routes
@@ -214,25 +364,43 @@ def serve_static(path):
 
 @app.route('/api/prints', methods=['GET'])
 def get_prints():
-    prints = PrintJob.query.order_by(PrintJob.start_time.desc()).all()
-    return jsonify([{
-        'id': p.id,
-        'filename': p.filename,
-        'start_time': p.start_time.isoformat(),
-        'status': p.status,
-        'quality_rating': p.quality_rating,
-        'functionality_rating': p.functionality_rating,
-        'label': p.label,
-        'ambient_temperature': p.ambient_temperature,
-        'ambient_humidity': p.ambient_humidity,
-        'notes': p.notes,
-        'parameters': [{
-            'name': param.parameter_name,
-            'value': param.parameter_value,
-            'is_changed': param.is_changed
-        } for param in p.parameters],
-        'all_slicer_params': p.all_slicer_params
-    } for p in prints])
+    # Load every print's parameters in one batched query instead of one per print,
+    # fetching in chunks so rows can be sent as soon as they are read
+    prints = PrintJob.query.options(selectinload(PrintJob.parameters))\
+                           .order_by(PrintJob.start_time.desc())\
+                           .yield_per(200)
+    # Run the query and fetch the first batch before the 200 goes out, so a
+    # database error still becomes a proper 500 instead of a truncated body
+    rows = iter(prints)
+    first = next(rows, None)
+    rows = chain((first,), rows) if first is not None else ()
+
+    def generate():
+        separator = ''
+        yield '['
+        for p in rows:
+            yield separator + app.json.dumps({
+                'id': p.id,
+                'filename': p.filename,
+                'start_time': p.start_time,
+                'status': p.status,
+                'quality_rating': p.quality_rating,
+                'functionality_rating': p.functionality_rating,
+                'label': p.label,
+                'ambient_temperature': p.ambient_temperature,
+                'ambient_humidity': p.ambient_humidity,
+                'notes': p.notes,
+                'parameters': [{
+                    'name': param.parameter_name,
+                    'value': param.parameter_value,
+                    'is_changed': param.is_changed
+                } for param in p.parameters],
+                'all_slicer_params': p.all_slicer_params
+            })
+            separator = ','
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 @app.route('/api/prints', methods=['POST'])
 def create_print():
@@ -248,12 +416,7 @@ def create_print():
 
     # Check for recent duplicate based on original filename (within last 10 minutes)
     recent_cutoff = datetime.utcnow() - timedelta(minutes=10)
-    existing_print = PrintJob.query.filter(
-        PrintJob.filename == file.filename,
-        PrintJob.start_time >= recent_cutoff
-    ).first()
-
-    if existing_print:
+    if recent_print_exists(file.filename, recent_cutoff):
         return jsonify({'error': f'A print with filename "{file.filename}" was already added recently'}), 409
 
     # Save the file
@@ -262,29 +425,23 @@ def create_print():
     file.save(filepath)
 
     # Parse GCode parameters
-    parser = GCodeParser()
-    parameters = parser.parse_file(filepath)
+    parameters = parse_gcode_file(filepath)
 
     # Create print job with additional safeguards
     try:
+        start_time = datetime.utcnow()
         new_print = PrintJob(
             filename=file.filename,
             gcode_path=filepath,
+            start_time=start_time,
+            start_bucket=duplicate_bucket(start_time),
             status='pending',
             all_slicer_params=parameters.get('all_slicer_params', {})
         )
         db.session.add(new_print)
         db.session.flush()  # Get the ID without committing
 
-        # Add parameters
-        for name, value in parameters.items():
-            if value is not None and name != 'all_slicer_params':
-                param = PrintParameters(
-                    print_job_id=new_print.id,
-                    parameter_name=name,
-                    parameter_value=str(value)
-                )
-                db.session.add(param)
+        insert_print_parameters(new_print.id, parameters)
 
         db.session.commit()
         print(f"Added manual print: {file.filename}")
@@ -293,8 +450,7 @@ def create_print():
         db.session.rollback()
         print(f"Error creating print job: {e}")
         # Check if it's a duplicate error
-        existing = PrintJob.query.filter_by(filename=file.filename).first()
-        if existing and (datetime.utcnow() - existing.start_time).total_seconds() < 600:
+        if recent_print_exists(file.filename, recent_cutoff):
             return jsonify({'error': 'Duplicate print detected during creation'}), 409
         return jsonify({'error': 'Failed to create print job'}), 500
 
@@ -327,7 +483,7 @@ def get_maintenance():
     return jsonify([{
         'id': e.id,
         'description': e.description,
-        'timestamp': e.timestamp.isoformat(),
+        'timestamp': e.timestamp,
         'todo_tasks': e.todo_tasks
     } for e in events])
 
@@ -353,101 +509,206 @@ def update_maintenance(maintenance_id):
     db.session.commit()
     return jsonify({'status': 'success'})
 
-@app.route('/api/printer_status')
-def printer_status():
+# Dashboards poll printer status constantly; answer from memory for a moment
+# and let a single request refresh it while the others wait for its result
+PRINTER_STATUS_TTL = 2.0
+_status_cache = {'ts': 0.0, 'val': None}
+_status_lock = threading.Lock()
+
+def fetch_printer_status():
     try:
-        resp = requests.get(f'{MOONRAKER_URL}/printer/info', timeout=3)
+        resp = MOONRAKER_SESSION.get(f'{MOONRAKER_URL}/printer/info', timeout=3)
         if resp.status_code == 200:
             return {'connected': True}
     except Exception:
         pass
     return {'connected': False}
 
+@app.route('/api/printer_status')
+def printer_status():
+    with _status_lock:
+        if time.monotonic() - _status_cache['ts'] >= PRINTER_STATUS_TTL:
+            _status_cache['val'] = fetch_printer_status()
+            _status_cache['ts'] = time.monotonic()
+        return dict(_status_cache['val'])
+
+PRINT_EXPORT_COLUMNS = [
+    'id', 'filename', 'start_time', 'end_time', 'status', 'quality_rating',
+    'functionality_rating', 'label', 'ambient_temperature', 'ambient_humidity',
+    'notes', 'parameters', 'all_slicer_params'
+]
+MAINTENANCE_EXPORT_COLUMNS = ['id', 'description', 'timestamp', 'todo_tasks']
+
+def write_export_row(sheet, row, values):
+    """Write one export row cell by cell.
+
+    Strings go through write_string so free text is never turned into a URL
+    or formula, and a cell xlsxwriter rejects or truncates (e.g. text over
+    Excel's 32767 character limit) doesn't drop the rest of the row the way
+    write_row would.
+    """
+    for col, value in enumerate(values):
+        if isinstance(value, str):
+            status = sheet.write_string(row, col, value)
+        else:
+            status = sheet.write(row, col, value)
+        if status:
+            print(f"Export warning: {sheet.name} row {row} column {col} written with status {status}")
+
+def build_export_workbook():
+    """Render every print job and maintenance event as xlsx bytes."""
+    # constant_memory flushes each row to a temp file once the next row starts,
+    # so only the current row is held in memory while the sheets are written
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'strings_to_urls': False})
+    header_format = workbook.add_format({'bold': True})
+
+    # Write print jobs as they are fetched, batching the parameter lookups
+    prints_sheet = workbook.add_worksheet('PrintJobs')
+    prints_sheet.write_row(0, 0, PRINT_EXPORT_COLUMNS, header_format)
+    prints = PrintJob.query.options(selectinload(PrintJob.parameters))\
+                           .order_by(PrintJob.start_time.desc())\
+                           .yield_per(500)
+    for row, p in enumerate(prints, start=1):
+        write_export_row(prints_sheet, row, [
+            p.id,
+            p.filename,
+            p.start_time.isoformat() if p.start_time else '',
+            p.end_time.isoformat() if p.end_time else '',
+            p.status,
+            p.quality_rating,
+            p.functionality_rating,
+            p.label,
+            p.ambient_temperature,
+            p.ambient_humidity,
+            p.notes,
+            str([{ 'name': param.parameter_name, 'value': param.parameter_value, 'is_changed': param.is_changed } for param in p.parameters]),
+            str(p.all_slicer_params)
+        ])
+
+    # Write maintenance events
+    maint_sheet = workbook.add_worksheet('Maintenance')
+    maint_sheet.write_row(0, 0, MAINTENANCE_EXPORT_COLUMNS, header_format)
+    events = MaintenanceEvent.query.order_by(MaintenanceEvent.timestamp.desc()).yield_per(500)
+    for row, e in enumerate(events, start=1):
+        write_export_row(maint_sheet, row, [
+            e.id,
+            e.description,
+            e.timestamp.isoformat() if e.timestamp else '',
+            e.todo_tasks
+        ])
+
+    workbook.close()
+    return output.getvalue()
+
+# Serve repeat exports from memory until the data changes. The key pairs a
+# counter bumped on every commit through our engine with row counts and max
+# ids, which also catch rows removed outside the app (cleanup_duplicates.py)
+_export_cache = {'key': None, 'data': None}
+_export_lock = threading.Lock()
+_commit_generation = 0
+
+def count_commit(conn):
+    global _commit_generation
+    _commit_generation += 1
+
+with app.app_context():
+    event.listen(db.engine, 'commit', count_commit)
+
+def export_cache_key():
+    prints = db.session.query(db.func.count(PrintJob.id), db.func.max(PrintJob.id)).one()
+    events = db.session.query(db.func.count(MaintenanceEvent.id), db.func.max(MaintenanceEvent.id)).one()
+    return (_commit_generation, tuple(prints), tuple(events))
+
 @app.route('/api/export')
 def export_database():
-    # Query all print jobs
-    prints = PrintJob.query.order_by(PrintJob.start_time.desc()).all()
-    prints_data = []
-    for p in prints:
-        prints_data.append({
-            'id': p.id,
-            'filename': p.filename,
-            'start_time': p.start_time.isoformat() if p.start_time else '',
-            'end_time': p.end_time.isoformat() if p.end_time else '',
-            'status': p.status,
-            'quality_rating': p.quality_rating,
-            'functionality_rating': p.functionality_rating,
-            'label': p.label,
-            'ambient_temperature': p.ambient_temperature,
-            'ambient_humidity': p.ambient_humidity,
-            'notes': p.notes,
-            'parameters': str([{ 'name': param.parameter_name, 'value': param.parameter_value, 'is_changed': param.is_changed } for param in p.parameters]),
-            'all_slicer_params': str(p.all_slicer_params)
-        })
-    prints_df = pd.DataFrame(prints_data)
-
-    # Query all maintenance events
-    events = MaintenanceEvent.query.order_by(MaintenanceEvent.timestamp.desc()).all()
-    maint_data = []
-    for e in events:
-        maint_data.append({
-            'id': e.id,
-            'description': e.description,
-            'timestamp': e.timestamp.isoformat() if e.timestamp else '',
-            'todo_tasks': e.todo_tasks
-        })
-    maint_df = pd.DataFrame(maint_data)
-
-    # Write to Excel in memory
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        prints_df.to_excel(writer, index=False, sheet_name='PrintJobs')
-        maint_df.to_excel(writer, index=False, sheet_name='Maintenance')
-    output.seek(0)
+    # Regenerate under the lock so concurrent clicks wait for one export
+    # instead of each building their own
+    with _export_lock:
+        key = export_cache_key()
+        if _export_cache['key'] != key:
+            _export_cache['data'] = build_export_workbook()
+            _export_cache['key'] = key
+        data = _export_cache['data']
 
     # Send as file download
     return send_file(
-        output,
+        io.BytesIO(data),
         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         as_attachment=True,
         download_name='printer_logbook_export.xlsx'
     )
 
+DEBUG_PAGE_LIMIT_MAX = 1000
+
+def page_args(default_limit):
+    """Read ?limit=&offset= from the request, clamping limit to a sane range."""
+    limit = request.args.get('limit', default_limit, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    return min(max(limit, 1), DEBUG_PAGE_LIMIT_MAX), max(offset, 0)
+
 @app.route('/api/debug/duplicates')
 def check_duplicates():
-    """Debug endpoint to check for potential duplicate prints"""
+    """Debug endpoint to check for potential duplicate prints
+
+    Pages through the duplicated prints with ?limit=100&offset=0; a group can
+    span pages, but its count is always the total for that filename.
+    """
+    limit, offset = page_args(100)
     duplicates = db.session.query(PrintJob.filename, db.func.count(PrintJob.id).label('count'))\
         .group_by(PrintJob.filename)\
         .having(db.func.count(PrintJob.id) > 1)\
-        .all()
+        .subquery()
+
+    prints = db.session.query(PrintJob, duplicates.c.count)\
+        .join(duplicates, PrintJob.filename == duplicates.c.filename)\
+        .order_by(PrintJob.filename, PrintJob.start_time)\
+        .limit(limit).offset(offset).all()
 
     result = []
-    for filename, count in duplicates:
-        prints = PrintJob.query.filter_by(filename=filename).order_by(PrintJob.start_time).all()
-        result.append({
-            'filename': filename,
-            'count': count,
-            'prints': [{
-                'id': p.id,
-                'start_time': p.start_time.isoformat(),
-                'status': p.status,
-                'gcode_path': p.gcode_path
-            } for p in prints]
+    for p, count in prints:
+        if not result or result[-1]['filename'] != p.filename:
+            result.append({
+                'filename': p.filename,
+                'count': count,
+                'prints': []
+            })
+        result[-1]['prints'].append({
+            'id': p.id,
+            'start_time': p.start_time,
+            'status': p.status,
+            'gcode_path': p.gcode_path
         })
 
     return jsonify({
         'duplicate_groups': result,
-        'total_duplicate_groups': len(result)
+        'total_duplicate_groups': db.session.query(duplicates).count(),
+        'limit': limit,
+        'offset': offset
     })
 
 @app.route('/api/debug/recent_prints')
 def recent_prints():
-    """Debug endpoint to show recent prints for monitoring"""
-    recent = PrintJob.query.order_by(PrintJob.start_time.desc()).limit(10).all()
+    """Debug endpoint to show recent prints for monitoring
+
+    Returns ?limit=10 prints; pass ?cursor=<id of the last print shown> for
+    the next older page.
+    """
+    limit, _ = page_args(10)
+    query = PrintJob.query
+    cursor = request.args.get('cursor', type=int)
+    if cursor is not None:
+        last = db.session.get(PrintJob, cursor)
+        if last:
+            query = query.filter(db.or_(
+                PrintJob.start_time < last.start_time,
+                db.and_(PrintJob.start_time == last.start_time, PrintJob.id < last.id)
+            ))
+    recent = query.order_by(PrintJob.start_time.desc(), PrintJob.id.desc()).limit(limit).all()
     return jsonify([{
         'id': p.id,
         'filename': p.filename,
-        'start_time': p.start_time.isoformat(),
+        'start_time': p.start_time,
         'status': p.status,
         'gcode_path': p.gcode_path[:50] + '...' if len(p.gcode_path) > 50 else p.gcode_path
     } for p in recent])
@@ -476,7 +737,7 @@ def monitor_duplicates():
                 'count': len(prints),
                 'prints': [{
                     'id': p.id,
-                    'start_time': p.start_time.isoformat(),
+                    'start_time': p.start_time,
                     'status': p.status,
                     'time_diff_seconds': (prints[0].start_time - p.start_time).total_seconds() if p != prints[0] else 0
                 } for p in sorted(prints, key=lambda x: x.start_time, reverse=True)]
@@ -492,7 +753,4 @@ if __name__ == '__main__':
     print(f"Starting Printer Logbook with Moonraker URL: {MOONRAKER_URL}")
     print(f"Poll interval: {POLL_INTERVAL} seconds")
 
-    with app.app_context():
-        # db.drop_all() # if for whatever reason you want to drop all
-        db.create_all()
     app.run(debug=True)
@@ -8,9 +8,13 @@ It can be run safely multiple times and provides options for automatic or intera
 
 import sqlite3
 import os
-from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
 import argparse
 
+# Maximum number of ids bound into a single DELETE ... IN (...) statement
+DELETE_BATCH_SIZE = 500
+
 def connect_to_db():
     """Connect to the SQLite database"""
     # Try the instance folder first (Flask default location)
@@ -30,37 +34,40 @@ def connect_to_db():
     return sqlite3.connect(db_path)
 
 def find_duplicates(conn):
-    """Find duplicate print jobs by filename"""
+    """Find duplicate print jobs by filename, best candidate to keep first"""
     cursor = conn.cursor()
 
-    # Find filenames that appear more than once
+    # Fetch every print whose filename appears more than once in a single query.
+    # Score each print for how complete its data is:
+    # Priority: 1) Has quality rating, 2) Has status='success', 3) Most recent
+    # The recency bonus is seconds since the epoch / 1e6, computed by SQLite.
     cursor.execute("""
-        SELECT filename, COUNT(*) as count
+        SELECT id, filename, start_time, status, quality_rating, gcode_path,
+               CASE WHEN quality_rating IS NOT NULL THEN 10 ELSE 0 END
+             + CASE status WHEN 'success' THEN 5 WHEN 'pending' THEN 1 ELSE 0 END
+             + CASE WHEN TRIM(gcode_path) <> '' THEN 3 ELSE 0 END
+             + COALESCE((julianday(start_time) - 2440587.5) * 86400.0 / 1000000, 0) AS score
         FROM print_job
-        GROUP BY filename
-        HAVING COUNT(*) > 1
-        ORDER BY count DESC, filename
+        WHERE filename IN (
+            SELECT filename
+            FROM print_job
+            GROUP BY filename
+            HAVING COUNT(*) > 1
+        )
+        ORDER BY filename, score DESC, start_time
     """)
 
-    duplicate_groups = cursor.fetchall()
-
     detailed_duplicates = []
-    for filename, count in duplicate_groups:
-        # Get all prints for this filename
-        cursor.execute("""
-            SELECT id, filename, start_time, status, quality_rating, gcode_path
-            FROM print_job
-            WHERE filename = ?
-            ORDER BY start_time
-        """, (filename,))
-
-        prints = cursor.fetchall()
+    for filename, group in groupby(cursor.fetchall(), key=itemgetter(1)):
+        prints = list(group)
         detailed_duplicates.append({
             'filename': filename,
-            'count': count,
+            'count': len(prints),
             'prints': prints
         })
 
+    # Largest groups first, as before
+    detailed_duplicates.sort(key=lambda group: -group['count'])
     return detailed_duplicates
 
 def analyze_duplicates(duplicates):
@@ -68,55 +75,11 @@ def analyze_duplicates(duplicates):
     recommendations = []
 
     for group in duplicates:
-        filename = group['filename']
-        prints = group['prints']
-
-        # Sort by start_time (already sorted from query)
-        keep_print = None
-        remove_prints = []
-
-        # Strategy: Keep the print with the most complete data
-        # Priority: 1) Has quality rating, 2) Has status='success', 3) Most recent
-
-        scored_prints = []
-        for print_data in prints:
-            id_, filename, start_time, status, quality_rating, gcode_path = print_data
-            score = 0
-
-            # Points for having quality rating
-            if quality_rating is not None:
-                score += 10
-
-            # Points for successful status
-            if status == 'success':
-                score += 5
-            elif status == 'pending':
-                score += 1
-
-            # Points for having gcode file
-            if gcode_path and gcode_path.strip():
-                score += 3
-
-            # Small bonus for being more recent (milliseconds since epoch)
-            try:
-                dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                score += dt.timestamp() / 1000000  # Very small bonus for recency
-            except:
-                pass
-
-            scored_prints.append((score, print_data))
-
-        # Sort by score (highest first)
-        scored_prints.sort(key=lambda x: x[0], reverse=True)
-
-        # Keep the highest scored print
-        keep_print = scored_prints[0][1]
-        remove_prints = [p[1] for p in scored_prints[1:]]
-
+        # Prints are already sorted by score (highest first); keep the best one
         recommendations.append({
-            'filename': filename,
-            'keep': keep_print,
-            'remove': remove_prints
+            'filename': group['filename'],
+            'keep': group['prints'][0],
+            'remove': group['prints'][1:]
         })
 
     return recommendations
@@ -152,7 +115,7 @@ def display_recommendations(recommendations):
 
 def remove_duplicates(conn, recommendations, interactive=True):
     """Remove duplicate entries based on recommendations"""
-    removed_count = 0
+    ids_to_remove = []
 
     for rec in recommendations:
         filename = rec['filename']
@@ -171,23 +134,26 @@ def remove_duplicates(conn, recommendations, interactive=True):
                 print("Skipped.")
                 continue
 
-        # Remove the duplicate entries
+        ids_to_remove.extend(r[0] for r in remove)
+
+    # Remove the duplicate entries with bulk deletes in a single transaction,
+    # batched to stay under SQLite's bound-parameter limit
+    with conn:
         cursor = conn.cursor()
-        for r in remove:
-            print_id = r[0]
+        for start in range(0, len(ids_to_remove), DELETE_BATCH_SIZE):
+            batch = ids_to_remove[start:start + DELETE_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
 
             # First remove associated parameters
-            cursor.execute("DELETE FROM print_parameters WHERE print_job_id = ?", (print_id,))
-
-            # Then remove the print job
-            cursor.execute("DELETE FROM print_job WHERE id = ?", (print_id,))
+            cursor.execute(f"DELETE FROM print_parameters WHERE print_job_id IN ({placeholders})", batch)
 
-            print(f"  Removed print ID {print_id}")
-            removed_count += 1
+            # Then remove the print jobs
+            cursor.execute(f"DELETE FROM print_job WHERE id IN ({placeholders})", batch)
 
-        conn.commit()
+    for print_id in ids_to_remove:
+        print(f"  Removed print ID {print_id}")
 
-    return removed_count
+    return len(ids_to_remove)
 
 def main():
     parser = argparse.ArgumentParser(description='Clean up duplicate print entries')
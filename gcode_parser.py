@@ -1,5 +1,12 @@
 import re
+import io
+import os
 import json
+import copy
+import mmap
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import Dict, Any
 
 class GCodeParser:
@@ -35,15 +42,36 @@ class GCodeParser:
 
     def parse_file(self, file_path: str) -> Dict[str, Any]:
         try:
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
+            return self.parse_regions(*self.read_regions(file_path))
+        except OSError as e:
+            print(f"Error parsing GCode file: {e}")
+            return {}
+
+    @classmethod
+    def read_regions(cls, file_path: str):
+        """Return the (header, trailer) bytes that parsing depends on.
+
+        Slicer settings live in the comments before the first G-code command
+        and after the last one, so the file is mapped and only those two
+        regions are copied out instead of reading every line of the body.
+        """
+        with open(file_path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                return b'', b''
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[:cls._header_end(mm)], mm[cls._trailer_start(mm):]
+
+    def parse_regions(self, header_bytes: bytes, trailer_bytes: bytes) -> Dict[str, Any]:
+        try:
+            lines = self._decode_lines(header_bytes)
+            trailer = self._decode_lines(trailer_bytes)
             header = self._extract_header(lines)
             self.slicer = self._detect_slicer(header)
             if self.slicer == 'PrusaSlicer':
                 self._parse_prusaslicer(header)
-                self._parse_prusaslicer_config_block(lines)
+                self._parse_prusaslicer_config_block(trailer)
             elif self.slicer == 'SuperSlicer':
-                self._parse_superslicer(header, lines)
+                self._parse_superslicer(header, trailer)
             elif self.slicer == 'Cura':
                 self._parse_cura(header)
             elif self.slicer == 'Bambu Studio':
@@ -58,6 +86,33 @@ class GCodeParser:
             print(f"Error parsing GCode file: {e}")
             return {}
 
+    @staticmethod
+    def _decode_lines(data: bytes):
+        # newline=None gives the same universal-newline handling as open(..., 'r')
+        return io.StringIO(data.decode('utf-8'), newline=None).readlines()
+
+    @staticmethod
+    def _header_end(mm) -> int:
+        """Offset just past the first G/M/T command line, or the file size."""
+        pos = 0
+        while pos < len(mm):
+            end = mm.find(b'\n', pos) + 1 or len(mm)
+            if re.match(rb'^[GMT]\d+', mm[pos:end].strip()):
+                return end
+            pos = end
+        return len(mm)
+
+    @staticmethod
+    def _trailer_start(mm) -> int:
+        """Offset just past the last line starting with G or M, or 0."""
+        end = len(mm)
+        while end > 0:
+            start = mm.rfind(b'\n', 0, end - 1) + 1
+            if mm[start:end].strip()[:1] in (b'G', b'M'):
+                return end
+            end = start
+        return 0
+
     def _extract_header(self, lines):
         header = []
         for line in lines:
@@ -350,3 +405,62 @@ class GCodeParser:
             # Stop after the initial header (optional: break at first G1/G0 command)
             if line and not line.startswith(';'):
                 break
+
+
+class _ParseCacheEntry:
+    def __init__(self):
+        self.ready = threading.Event()
+        self.result = None
+
+_PARSE_CACHE_SIZE = 128
+_parse_cache = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+def regions_key(header: bytes, trailer: bytes) -> str:
+    """Return a BLAKE2b digest identifying a file's header and trailer regions."""
+    digest = hashlib.blake2b(digest_size=16)
+    # Length-prefix the header so the split point is part of the key
+    digest.update(len(header).to_bytes(8, 'little'))
+    digest.update(header)
+    digest.update(trailer)
+    return digest.hexdigest()
+
+def parse_gcode_file(file_path: str) -> Dict[str, Any]:
+    """Parse a GCode file, reusing the result for any file with the same settings.
+
+    The cache is keyed on the header and trailer regions, which are all the
+    parser reads, so hashing stays as cheap as the parse itself whatever the
+    size of the body. Concurrent calls for the same content wait for the
+    first parse rather than repeating it. Failed parses are not cached so a
+    retry parses again.
+    """
+    try:
+        regions = GCodeParser.read_regions(file_path)
+    except OSError as e:
+        print(f"Error parsing GCode file: {e}")
+        return {}
+    key = regions_key(*regions)
+
+    with _parse_cache_lock:
+        entry = _parse_cache.get(key)
+        owner = entry is None
+        if owner:
+            entry = _parse_cache[key] = _ParseCacheEntry()
+            while len(_parse_cache) > _PARSE_CACHE_SIZE:
+                _parse_cache.popitem(last=False)
+        else:
+            _parse_cache.move_to_end(key)
+
+    if owner:
+        try:
+            entry.result = GCodeParser().parse_regions(*regions)
+        finally:
+            if not entry.result:
+                with _parse_cache_lock:
+                    if _parse_cache.get(key) is entry:
+                        del _parse_cache[key]
+            entry.ready.set()
+    else:
+        entry.ready.wait()
+
+    return copy.deepcopy(entry.result) if entry.result else {}
@@ -16,38 +16,59 @@ Usage:
 
 import os
 import sys
+import errno
 import shutil
 import argparse
+import queue
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
+# Files copied at once when backup/restore has to fall back from hardlinks;
+# raise it for fast SSDs/NVMe, lower it for spinning disks
+DEFAULT_COPY_WORKERS = 8
+
+# Candidate locations, checked in order: the working directory first, then
+# next to this script
+_HERE = Path(__file__).resolve().parent
+_DB_CANDIDATES = (
+    Path('instance/printer_logbook.db'),
+    Path('printer_logbook.db'),
+    _HERE / 'instance' / 'printer_logbook.db',
+    _HERE / 'printer_logbook.db',
+)
+_UPLOADS_CANDIDATES = (
+    Path('uploads'),
+    _HERE / 'uploads',
+)
+
+@lru_cache(maxsize=4)
+def _first_existing(paths):
+    """Return the first of paths that exists, as a string, or None."""
+    return next((str(p) for p in paths if p.exists()), None)
+
 def get_database_path():
     """Get the database file path."""
-    # Check common locations
-    possible_paths = [
-        'instance/printer_logbook.db',
-        'printer_logbook.db',
-        os.path.join(os.path.dirname(__file__), 'instance', 'printer_logbook.db'),
-        os.path.join(os.path.dirname(__file__), 'printer_logbook.db')
-    ]
-
-    for path in possible_paths:
-        if os.path.exists(path):
-            return path
-    return None
+    return _first_existing(_DB_CANDIDATES)
 
 def get_uploads_path():
     """Get the uploads directory path."""
-    possible_paths = [
-        'uploads',
-        os.path.join(os.path.dirname(__file__), 'uploads')
-    ]
+    return _first_existing(_UPLOADS_CANDIDATES)
+
+DATA_TABLES = ('print_job', 'maintenance_event', 'print_parameters')
 
-    for path in possible_paths:
-        if os.path.exists(path):
-            return path
-    return None
+def existing_tables(cursor, tables):
+    """Return the subset of tables that exist in the database, in order."""
+    cursor.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ({','.join('?' * len(tables))})",
+        tables
+    )
+    existing = {row[0] for row in cursor.fetchall()}
+    return [table for table in tables if table in existing]
 
 def count_records(db_path):
     """Count records in database tables."""
@@ -55,20 +76,16 @@ def count_records(db_path):
         return {}
 
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        with closing(sqlite3.connect(db_path)) as conn:
+            cursor = conn.cursor()
+            counts = {table: 0 for table in DATA_TABLES}
 
-        counts = {}
-        tables = ['print_job', 'maintenance_event', 'print_parameters']
+            # Skip missing tables up front, then count the rest in one statement
+            present = existing_tables(cursor, DATA_TABLES)
+            if present:
+                cursor.execute("SELECT " + ", ".join(f"(SELECT COUNT(*) FROM {table})" for table in present))
+                counts.update(zip(present, cursor.fetchone()))
 
-        for table in tables:
-            try:
-                cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                counts[table] = cursor.fetchone()[0]
-            except sqlite3.OperationalError:
-                counts[table] = 0
-
-        conn.close()
         return counts
     except Exception as e:
         print(f"Error reading database: {e}")
@@ -76,12 +93,98 @@ def count_records(db_path):
 
 def count_files(uploads_path):
     """Count files in uploads directory."""
-    if not uploads_path or not os.path.exists(uploads_path):
+    if not uploads_path:
         return 0
 
-    return len([f for f in os.listdir(uploads_path) if os.path.isfile(os.path.join(uploads_path, f))])
+    # DirEntry.is_file() uses the type from the directory listing, no stat() per
+    # file; readdir() already fetches entries in batches on Linux and macOS
+    try:
+        with os.scandir(uploads_path) as entries:
+            return sum(1 for entry in entries if entry.is_file())
+    except FileNotFoundError:
+        return 0
 
-def create_backup(db_path, uploads_path):
+def backup_database(db_path, backup_db_path):
+    """Snapshot the database with SQLite's online backup API.
+
+    Unlike a file copy this takes the proper locks and includes anything still
+    in the WAL, so it is consistent even while the app is running.
+    """
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(backup_db_path)
+    try:
+        with dst:
+            src.backup(dst, pages=-1)
+    finally:
+        dst.close()
+        src.close()
+
+def copy_file(src, dst):
+    """Copy a single file with copy_file_range where available, which lets
+    btrfs/XFS reflink the data instead of moving it through userspace, and
+    fall back to a plain copy across filesystems or where it is unsupported."""
+    with open(src, 'rb', buffering=0) as fsrc, open(dst, 'wb', buffering=0) as fdst:
+        if hasattr(os, 'copy_file_range'):
+            size = os.fstat(fsrc.fileno()).st_size
+            try:
+                while os.copy_file_range(fsrc.fileno(), fdst.fileno(), size):
+                    pass
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                    raise
+        # Picks up from wherever copy_file_range stopped; both offsets advance together
+        shutil.copyfileobj(fsrc, fdst)
+    shutil.copystat(src, dst)
+
+def link_or_copy(src, dst):
+    """Hardlink src to dst, falling back to a real copy across devices or on
+    filesystems without hardlink support."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def parallel_copy_tree(src_dir, dst_dir, workers=DEFAULT_COPY_WORKERS, copied=None):
+    """Mirror src_dir into dst_dir with link_or_copy, running the per-file work
+    on a thread pool so real copies (e.g. across devices) overlap their I/O.
+
+    If a copied queue is given, each (source, copy) pair is put on it once
+    the copy has landed.
+    """
+    def copy_one(src, dst):
+        link_or_copy(src, dst)
+        if copied is not None:
+            copied.put((src, dst))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for root, _, files in os.walk(src_dir):
+            target = os.path.join(dst_dir, os.path.relpath(root, src_dir))
+            os.makedirs(target, exist_ok=True)
+            for name in files:
+                futures.append(pool.submit(copy_one, os.path.join(root, name), os.path.join(target, name)))
+        # Surface the first failure, if any
+        for future in futures:
+            future.result()
+
+def remove_copied_files(copied, removed):
+    """Unlink source files as the backup reports them copied, until None.
+
+    Each (source, copy) pair that was unlinked is appended to removed so a
+    failed backup can put it back. Failures are left for reset_uploads,
+    which clears whatever remains.
+    """
+    while True:
+        item = copied.get()
+        if item is None:
+            return
+        try:
+            os.unlink(item[0])
+        except OSError:
+            continue
+        removed.append(item)
+
+def create_backup(db_path, uploads_path, workers=DEFAULT_COPY_WORKERS, copied=None):
     """Create a backup of the current data."""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     backup_dir = f"backup_{timestamp}"
@@ -92,48 +195,78 @@ def create_backup(db_path, uploads_path):
     # Backup database
     if db_path and os.path.exists(db_path):
         backup_db_path = os.path.join(backup_dir, 'printer_logbook.db')
-        shutil.copy2(db_path, backup_db_path)
+        backup_database(db_path, backup_db_path)
         print(f"  ✅ Database backed up to {backup_db_path}")
 
     # Backup uploads
     if uploads_path and os.path.exists(uploads_path):
         backup_uploads_path = os.path.join(backup_dir, 'uploads')
-        shutil.copytree(uploads_path, backup_uploads_path)
+        # Uploaded G-code is never modified in place, so hardlinks are a safe
+        # and near-free stand-in for copies
+        parallel_copy_tree(uploads_path, backup_uploads_path, workers, copied)
         print(f"  ✅ Uploads backed up to {backup_uploads_path}")
 
     # Create backup info file
     info_file = os.path.join(backup_dir, 'backup_info.txt')
-    with open(info_file, 'w') as f:
-        f.write(f"Printer Logbook Backup\n")
-        f.write(f"Created: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Database: {db_path}\n")
-        f.write(f"Uploads: {uploads_path}\n")
+    Path(info_file).write_text(
+        f"Printer Logbook Backup\n"
+        f"Created: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"Database: {db_path}\n"
+        f"Uploads: {uploads_path}\n"
+    )
 
     print(f"  ✅ Backup complete: {backup_dir}")
     return backup_dir
 
 def reset_database(db_path):
-    """Reset the database by dropping and recreating tables."""
+    """Reset the database by deleting all rows, keeping the schema in place."""
     if not os.path.exists(db_path):
         print("  ℹ️  No database found to reset")
         return
 
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        with closing(sqlite3.connect(db_path)) as conn:
+            cursor = conn.cursor()
+
+            # The data is being thrown away, so skip the fsyncs and keep
+            # VACUUM's temp tables off disk. journal_mode is left alone: the
+            # app keeps this file in WAL mode and the setting is persistent.
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA temp_store=MEMORY")
 
-        # Drop tables if they exist
-        tables = ['print_job', 'maintenance_event', 'print_parameters']
-        for table in tables:
-            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            # Only touch tables that exist; sqlite_sequence is only created for
+            # AUTOINCREMENT tables and resets their id counters
+            existing = {row[0] for row in cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")}
+            tables = ['print_parameters', 'print_job', 'maintenance_event', 'sqlite_sequence']
 
-        conn.commit()
-        conn.close()
+            # An unqualified DELETE hits SQLite's truncate optimization, and one
+            # script in one transaction means a single commit
+            script = ''.join(f"DELETE FROM {table};" for table in tables if table in existing)
+            cursor.executescript(f"BEGIN;{script}COMMIT;")
+
+            # Give the freed pages back to the filesystem
+            cursor.execute("VACUUM")
 
         print(f"  ✅ Database reset: {db_path}")
-    except Exception as e:
+    except sqlite3.Error as e:
         print(f"  ❌ Error resetting database: {e}")
 
+def clear_directory(path):
+    """Empty a directory, creating it if missing.
+
+    The directory itself is kept, so a symlinked uploads folder (e.g. on
+    external storage) keeps its link and the folder its owner and mode.
+    """
+    os.makedirs(path, exist_ok=True)
+    with os.scandir(path) as entries:
+        for entry in entries:
+            # Symlinks are unlinked, never followed
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+
 def reset_uploads(uploads_path):
     """Clear all files from uploads directory."""
     if not uploads_path or not os.path.exists(uploads_path):
@@ -141,16 +274,13 @@ def reset_uploads(uploads_path):
         return
 
     try:
-        for filename in os.listdir(uploads_path):
-            file_path = os.path.join(uploads_path, filename)
-            if os.path.isfile(file_path):
-                os.unlink(file_path)
+        clear_directory(uploads_path)
 
         print(f"  ✅ Uploads cleared: {uploads_path}")
     except Exception as e:
         print(f"  ❌ Error clearing uploads: {e}")
 
-def restore_from_backup(backup_path):
+def restore_from_backup(backup_path, workers=DEFAULT_COPY_WORKERS):
     """Restore data from a backup directory."""
     if not os.path.exists(backup_path):
         print(f"❌ Backup directory not found: {backup_path}")
@@ -163,30 +293,42 @@ def restore_from_backup(backup_path):
     if os.path.exists(backup_db):
         # Ensure instance directory exists
         os.makedirs('instance', exist_ok=True)
-        shutil.copy2(backup_db, 'instance/printer_logbook.db')
+        target_db = 'instance/printer_logbook.db'
+        # Stage the copy beside the target and swap it in with one atomic
+        # rename. The backup itself is copied, not moved or linked, so it
+        # stays intact and the app never writes into it.
+        staged_db = target_db + '.restore'
+        copy_file(backup_db, staged_db)
+        # A WAL left over from the old database must not be replayed onto
+        # the restored one, so remove it before the swap rather than after
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(target_db + suffix):
+                os.unlink(target_db + suffix)
+        os.replace(staged_db, target_db)
         print("  ✅ Database restored")
+        # Pooled connections in a running app keep the replaced file open
+        # and would go on writing to it
+        print("  ⚠️  Restart the app if it is running so it opens the restored database")
 
     # Restore uploads
     backup_uploads = os.path.join(backup_path, 'uploads')
     if os.path.exists(backup_uploads):
-        # Ensure uploads directory exists
-        os.makedirs('uploads', exist_ok=True)
-        # Clear existing uploads
-        for filename in os.listdir('uploads'):
-            file_path = os.path.join('uploads', filename)
-            if os.path.isfile(file_path):
-                os.unlink(file_path)
-        # Copy backup files
-        for filename in os.listdir(backup_uploads):
-            src = os.path.join(backup_uploads, filename)
-            dst = os.path.join('uploads', filename)
-            if os.path.isfile(src):
-                shutil.copy2(src, dst)
+        # Clear existing uploads, leaving an empty uploads directory
+        clear_directory('uploads')
+        # Hardlink backup files back in; the backup keeps its own links
+        parallel_copy_tree(backup_uploads, 'uploads', workers)
         print("  ✅ Uploads restored")
 
     print("Restore complete!")
     return True
 
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
 def main():
     parser = argparse.ArgumentParser(description='Reset Printer Logbook data')
     parser.add_argument('--force', action='store_true',
@@ -195,6 +337,8 @@ def main():
                        help='Only create backup, do not reset')
     parser.add_argument('--restore', type=str, metavar='BACKUP_DIR',
                        help='Restore from backup directory')
+    parser.add_argument('--copy-workers', type=positive_int, default=DEFAULT_COPY_WORKERS, metavar='N',
+                       help=f'Concurrent file copies when backup/restore cannot hardlink (default: {DEFAULT_COPY_WORKERS})')
     parser.add_argument('--no-backup', action='store_true',
                        help='Reset without creating backup (dangerous!)')
 
@@ -205,7 +349,7 @@ def main():
 
     # Handle restore operation
     if args.restore:
-        return 0 if restore_from_backup(args.restore) else 1
+        return 0 if restore_from_backup(args.restore, args.copy_workers) else 1
 
     # Find data locations
     db_path = get_database_path()
@@ -213,27 +357,24 @@ def main():
 
     # Show current data status
     print("Current data status:")
+    counts = count_records(db_path) if db_path else {}
     if db_path:
-        counts = count_records(db_path)
         print(f"  📊 Database: {db_path}")
         for table, count in counts.items():
             print(f"     {table}: {count} records")
     else:
         print("  📊 Database: Not found")
 
+    file_count = count_files(uploads_path) if uploads_path else 0
     if uploads_path:
-        file_count = count_files(uploads_path)
         print(f"  📁 Uploads: {uploads_path} ({file_count} files)")
     else:
         print("  📁 Uploads: Not found")
 
     # Check if there's any data to reset
-    has_data = False
-    if db_path:
-        counts = count_records(db_path)
-        has_data = any(count > 0 for count in counts.values())
-    if uploads_path:
-        has_data = has_data or count_files(uploads_path) > 0
+    # count_records already ran for the status display, so reuse its totals
+    # rather than probing the database again
+    has_data = any(count > 0 for count in counts.values()) or file_count > 0
 
     if not has_data:
         print("\n✅ No data found to reset. Database is already clean.")
@@ -242,7 +383,7 @@ def main():
     # Backup-only mode
     if args.backup_only:
         print("\n📦 Creating backup only (no reset)...")
-        create_backup(db_path, uploads_path)
+        create_backup(db_path, uploads_path, args.copy_workers)
         return 0
 
     # Confirmation prompt
@@ -259,7 +400,23 @@ def main():
     backup_dir = None
     if not args.no_backup:
         print("\n📦 Creating backup...")
-        backup_dir = create_backup(db_path, uploads_path)
+        # Start deleting uploads as soon as each one is safely in the backup
+        # rather than waiting for the whole backup to finish
+        copied = queue.Queue()
+        removed = []
+        remover = threading.Thread(target=remove_copied_files, args=(copied, removed))
+        remover.start()
+        try:
+            backup_dir = create_backup(db_path, uploads_path, args.copy_workers, copied)
+        finally:
+            copied.put(None)
+            remover.join()
+            if backup_dir is None and removed:
+                # The backup failed and nothing will be reset, so put the
+                # uploads already removed back from their backup copies
+                for src, dst in removed:
+                    link_or_copy(dst, src)
+                print(f"  ↩️  Put back {len(removed)} uploads removed during the failed backup")
 
     # Perform reset
     print("\n🔄 Resetting data...")
@@ -277,7 +434,7 @@ def main():
 
     print("\nNext steps:")
     print("1. Start the application: python app.py")
-    print("2. The database will be recreated automatically on first run")
+    print("2. The database schema is kept, so the app starts with empty tables")
 
     return 0
 
@@ -116,7 +116,7 @@ def test_moonraker_connection(url):
 
 def check_dependencies():
     """Check if required dependencies are installed."""
-    required_packages = ['flask', 'flask_sqlalchemy', 'flask_cors', 'requests', 'python-dotenv']
+    required_packages = ['flask', 'flask_sqlalchemy', 'flask_cors', 'requests', 'python-dotenv', 'orjson', 'xlsxwriter']
     missing_packages = []
 
     for package in required_packages: